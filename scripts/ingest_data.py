@@ -7,11 +7,12 @@ Uploads NYC service documents and processes them for vector search.
 import os
 import sys
 import json
+import hashlib
 import logging
 import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import List, Dict, Any
-import boto3
 from botocore.exceptions import ClientError
 
 # Add src to path for imports
@@ -21,40 +22,69 @@ sys.path.append(str(Path(__file__).parent.parent / 'src'))
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# AWS clients
-s3 = boto3.client('s3')
-bedrock = boto3.client('bedrock')
+# S3 connection pool size for concurrent file and part uploads
+# (botocore's default of 10 would cap effective concurrency)
+S3_MAX_POOL_CONNECTIONS = 128
 
-def upload_document_to_s3(file_path: str, bucket_name: str, s3_key: str) -> bool:
+# File types accepted for ingestion
+SUPPORTED_EXTENSIONS = frozenset({'.pdf', '.txt', '.md', '.html'})
+
+# Multipart transfer defaults: larger parts upload in parallel within a single file
+MIB = 1024 * 1024
+DEFAULT_CHUNK_MIB = 64
+DEFAULT_PART_CONCURRENCY = 16
+
+def upload_document_to_s3(s3: Any, file_path: str, bucket_name: str, s3_key: str, transfer_config: Any) -> bool:
     """
     Upload a document to S3.
     
     Args:
+        s3: boto3 S3 client
         file_path: Local path to the document
         bucket_name: S3 bucket name
         s3_key: S3 object key
+        transfer_config: boto3 TransferConfig with multipart settings
         
     Returns:
         True if successful, False otherwise
     """
+    from boto3.exceptions import S3UploadFailedError
+    
     try:
         logger.info(f"Uploading {file_path} to s3://{bucket_name}/{s3_key}")
         
-        with open(file_path, 'rb') as file:
-            s3.upload_fileobj(file, bucket_name, s3_key)
+        # upload_file lets s3transfer read multipart ranges with independent file handles
+        s3.upload_file(file_path, bucket_name, s3_key, Config=transfer_config)
         
         logger.info(f"Successfully uploaded {s3_key}")
         return True
         
+    except S3UploadFailedError as e:
+        logger.error(f"S3 upload failed for {file_path}: {e}")
+        return False
     except Exception as e:
         logger.error(f"Error uploading {file_path}: {e}")
         return False
 
-def create_knowledge_base_data_source(knowledge_base_id: str, bucket_name: str, data_source_name: str) -> str:
+def compute_file_digest(file_path: str) -> str:
+    """
+    Compute the SHA-256 digest of a file's contents.
+    
+    Args:
+        file_path: Local path to the document
+        
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    with open(file_path, 'rb') as file:
+        return hashlib.file_digest(file, 'sha256').hexdigest()
+
+def create_knowledge_base_data_source(bedrock: Any, knowledge_base_id: str, bucket_name: str, data_source_name: str) -> str:
     """
     Create a data source in the Bedrock Knowledge Base.
     
     Args:
+        bedrock: boto3 Bedrock client
         knowledge_base_id: Knowledge Base ID
         bucket_name: S3 bucket containing documents
         data_source_name: Name for the data source
@@ -85,11 +115,12 @@ def create_knowledge_base_data_source(knowledge_base_id: str, bucket_name: str,
         logger.error(f"Error creating data source: {e}")
         raise
 
-def start_ingestion_job(knowledge_base_id: str, data_source_id: str) -> str:
+def start_ingestion_job(bedrock: Any, knowledge_base_id: str, data_source_id: str) -> str:
     """
     Start an ingestion job to process documents.
     
     Args:
+        bedrock: boto3 Bedrock client
         knowledge_base_id: Knowledge Base ID
         data_source_id: Data Source ID
         
@@ -111,11 +142,12 @@ def start_ingestion_job(knowledge_base_id: str, data_source_id: str) -> str:
         logger.error(f"Error starting ingestion job: {e}")
         raise
 
-def wait_for_ingestion_completion(knowledge_base_id: str, job_id: str, timeout_minutes: int = 30) -> bool:
+def wait_for_ingestion_completion(bedrock: Any, knowledge_base_id: str, job_id: str, timeout_minutes: int = 30) -> bool:
     """
     Wait for ingestion job to complete.
     
     Args:
+        bedrock: boto3 Bedrock client
         knowledge_base_id: Knowledge Base ID
         job_id: Ingestion Job ID
         timeout_minutes: Maximum time to wait
@@ -123,11 +155,18 @@ def wait_for_ingestion_completion(knowledge_base_id: str, job_id: str, timeout_m
     Returns:
         True if successful, False if failed or timed out
     """
+    import random
     import time
     
     start_time = time.time()
     timeout_seconds = timeout_minutes * 60
     
+    # Poll with exponential backoff (2s -> 30s) plus jitter, resetting on status change
+    initial_delay = 2.0
+    max_delay = 30.0
+    delay = initial_delay
+    last_status = None
+    
     while time.time() - start_time < timeout_seconds:
         try:
             response = bedrock.get_ingestion_job(
@@ -138,6 +177,10 @@ def wait_for_ingestion_completion(knowledge_base_id: str, job_id: str, timeout_m
             status = response['ingestionJob']['status']
             logger.info(f"Ingestion job status: {status}")
             
+            if status != last_status:
+                delay = initial_delay
+                last_status = status
+            
             if status == 'COMPLETED':
                 logger.info("Ingestion job completed successfully!")
                 return True
@@ -145,15 +188,15 @@ def wait_for_ingestion_completion(knowledge_base_id: str, job_id: str, timeout_m
                 logger.error("Ingestion job failed!")
                 return False
             elif status in ['IN_PROGRESS', 'STARTING']:
-                logger.info("Ingestion job in progress, waiting...")
-                time.sleep(30)  # Wait 30 seconds before checking again
+                logger.info(f"Ingestion job in progress, checking again in {delay:.1f}s...")
             else:
                 logger.warning(f"Unknown ingestion job status: {status}")
-                time.sleep(30)
                 
         except ClientError as e:
             logger.error(f"Error checking ingestion job status: {e}")
-            time.sleep(30)
+        
+        time.sleep(delay + random.uniform(0, delay * 0.1))
+        delay = min(delay * 1.5, max_delay)
     
     logger.error(f"Ingestion job timed out after {timeout_minutes} minutes")
     return False
@@ -177,6 +220,11 @@ def main():
     parser.add_argument('--bucket-name', required=True, help='S3 bucket name for documents')
     parser.add_argument('--documents-dir', required=True, help='Local directory containing documents')
     parser.add_argument('--data-source-name', default='nyc-service-documents', help='Name for the data source')
+    parser.add_argument('--concurrency', type=int, default=16, help='Number of concurrent S3 uploads')
+    parser.add_argument('--chunk-mib', type=int, default=DEFAULT_CHUNK_MIB, help='Multipart threshold and part size in MiB')
+    parser.add_argument('--part-concurrency', type=int, default=DEFAULT_PART_CONCURRENCY, help='Number of concurrent part uploads per file')
+    parser.add_argument('--wait', action=argparse.BooleanOptionalAction, default=False,
+                        help='Wait for the ingestion job to finish instead of returning once it starts')
     
     args = parser.parse_args()
     
@@ -185,16 +233,86 @@ def main():
         logger.error(f"Documents directory does not exist: {args.documents_dir}")
         sys.exit(1)
     
-    # Upload documents to S3
-    documents_dir = Path(args.documents_dir)
+    # Import boto3 only once arguments are valid; it is slow to load
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
+    
+    s3 = boto3.client('s3', config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS))
+    bedrock = boto3.client('bedrock')
+    
+    transfer_config = TransferConfig(
+        multipart_threshold=args.chunk_mib * MIB,
+        multipart_chunksize=args.chunk_mib * MIB,
+        max_concurrency=args.part_concurrency,
+        use_threads=True
+    )
+    seen_digests = {}  # content digest -> S3 key of the first copy
+    skipped_duplicates = {}  # content digest -> [(file_path, s3_key)] not uploaded yet
     uploaded_count = 0
     
-    for file_path in documents_dir.rglob('*'):
-        if file_path.is_file() and file_path.suffix.lower() in ['.pdf', '.txt', '.md', '.html']:
-            s3_key = f"documents/{file_path.relative_to(documents_dir)}"
+    # Walk the documents directory in sorted order and submit uploads as files are
+    # found (the boto3 client is thread-safe). Hashing stays on this thread so the
+    # first copy of a duplicate is always the same one, which means large files are
+    # read in full before their upload starts.
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        futures = {}
+        
+        for dirpath, dirnames, filenames in os.walk(args.documents_dir):
+            dirnames.sort()
+            filenames.sort()
+            
+            for name in filenames:
+                if os.path.splitext(name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                    continue
+                
+                file_path = os.path.join(dirpath, name)
+                if not os.path.isfile(file_path):
+                    continue
+                
+                relative_path = os.path.relpath(file_path, args.documents_dir).replace(os.sep, '/')
+                s3_key = f"documents/{relative_path}"
+                
+                # Skip files whose content is identical to one already queued
+                try:
+                    digest = compute_file_digest(file_path)
+                except OSError as e:
+                    logger.error(f"Error reading {file_path}: {e}")
+                    continue
+                
+                if digest in seen_digests:
+                    logger.info(f"Skipping {file_path}: duplicate of {seen_digests[digest]}")
+                    skipped_duplicates.setdefault(digest, []).append((file_path, s3_key))
+                    continue
+                
+                seen_digests[digest] = s3_key
+                future = executor.submit(
+                    upload_document_to_s3, s3, file_path, args.bucket_name, s3_key, transfer_config
+                )
+                futures[future] = (file_path, digest)
+        
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
             
-            if upload_document_to_s3(str(file_path), args.bucket_name, s3_key):
-                uploaded_count += 1
+            for future in done:
+                file_path, digest = futures.pop(future)
+                if future.result():
+                    uploaded_count += 1
+                    continue
+                
+                logger.error(f"Failed to upload {file_path}")
+                
+                # Upload a skipped duplicate instead so the content still reaches S3
+                duplicates = skipped_duplicates.get(digest)
+                if duplicates:
+                    duplicate_path, duplicate_key = duplicates.pop(0)
+                    logger.info(f"Uploading duplicate {duplicate_path} in place of {file_path}")
+                    retry = executor.submit(
+                        upload_document_to_s3, s3, duplicate_path, args.bucket_name, duplicate_key, transfer_config
+                    )
+                    futures[retry] = (duplicate_path, digest)
+                    pending.add(retry)
     
     logger.info(f"Uploaded {uploaded_count} documents to S3")
     
@@ -205,16 +323,22 @@ def main():
     # Create data source
     try:
         data_source_id = create_knowledge_base_data_source(
+            bedrock,
             args.knowledge_base_id,
             args.bucket_name,
             args.data_source_name
         )
         
         # Start ingestion job
-        job_id = start_ingestion_job(args.knowledge_base_id, data_source_id)
+        job_id = start_ingestion_job(bedrock, args.knowledge_base_id, data_source_id)
+        
+        if not args.wait:
+            logger.info(f"Ingestion job {job_id} started; not waiting for completion (use --wait to poll)")
+            print(job_id)
+            return
         
         # Wait for completion
-        success = wait_for_ingestion_completion(args.knowledge_base_id, job_id)
+        success = wait_for_ingestion_completion(bedrock, args.knowledge_base_id, job_id)
         
         if success:
             logger.info("Data ingestion completed successfully!")
@@ -1,11 +1,14 @@
+import hmac
 import json
 import logging
 import os
 from typing import Dict, Any
+from structured_logging import configure_json_logging
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+configure_json_logging(logger)
 
 # Environment variables
 API_KEY = os.environ['API_KEY']
@@ -26,10 +29,10 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         headers = event.get('headers', {})
         api_key = headers.get('x-api-key', '')
         
-        logger.info(f"Authorizing request with API key: {api_key[:8]}...")
+        logger.info("Authorizing request", extra={'api_key_present': bool(api_key), 'api_key_length': len(api_key)})
         
-        # Validate API key
-        if api_key == API_KEY:
+        # Validate API key (constant-time comparison to avoid timing side channels)
+        if hmac.compare_digest(api_key.encode('utf-8'), API_KEY.encode('utf-8')):
             logger.info("API key validation successful")
             return generate_policy('Allow', event['methodArn'])
         else:
@@ -37,7 +40,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return generate_policy('Deny', event['methodArn'])
             
     except Exception as e:
-        logger.error(f"Error in authorizer: {str(e)}", exc_info=True)
+        logger.error("Error in authorizer: %s", e, exc_info=True)
         return generate_policy('Deny', event['methodArn'])
 
 def generate_policy(effect: str, resource: str) -> Dict[str, Any]:
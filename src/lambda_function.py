@@ -2,22 +2,82 @@ import json
 import logging
 import os
 import time
-from typing import Dict, List, Any
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from structured_logging import configure_json_logging
+
+# Optional fast JSON encoder; falls back to the standard library when unavailable
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+configure_json_logging(logger)
+
+# orjson is packaged by src/Makefile; a missing or wrong-platform wheel means a mis-built artifact
+if orjson is None:
+    logger.warning("orjson is not available; falling back to the standard json module")
 
-# Initialize AWS clients
-bedrock_runtime = boto3.client('bedrock-runtime')
-bedrock_agent = boto3.client('bedrock-agent-runtime')
-s3 = boto3.client('s3')
+# Initialize AWS clients once per container; pin the region Lambda provides
+# so botocore skips region resolution on cold start
+AWS_REGION = os.environ.get('AWS_REGION')
+# Retrieval is short, so it gets a tight read timeout and retries. Non-streaming
+# generation sends no bytes until the whole answer is ready, so its read timeout
+# is close to the 30s function timeout. A generation retry therefore only fits
+# after a fast failure such as throttling; a read timeout uses up the invocation.
+CLIENT_CONFIG = Config(
+    max_pool_connections=50,
+    retries={'mode': 'adaptive', 'total_max_attempts': 3},
+    tcp_keepalive=True,
+    connect_timeout=3,
+    read_timeout=5
+)
+GENERATION_CLIENT_CONFIG = CLIENT_CONFIG.merge(Config(
+    retries={'mode': 'adaptive', 'total_max_attempts': 2},
+    read_timeout=25
+))
+bedrock_runtime = boto3.client('bedrock-runtime', region_name=AWS_REGION, config=GENERATION_CLIENT_CONFIG)
+bedrock_agent = boto3.client('bedrock-agent-runtime', region_name=AWS_REGION, config=CLIENT_CONFIG)
 
 # Environment variables
 KNOWLEDGE_BASE_ID = os.environ['KNOWLEDGE_BASE_ID']
 BEDROCK_MODEL_ID = os.environ['BEDROCK_MODEL_ID']
+STREAM_RESPONSES = os.environ.get('STREAM_RESPONSES', '0') == '1'
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', '60'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '1024'))
+
+# In-container LRU cache of generated answers: (normalized query, top_k) -> (expires_at, answer, citations)
+response_cache: "OrderedDict[Tuple[str, Any], Tuple[float, str, List[Dict[str, Any]]]]" = OrderedDict()
+
+# Static generation settings for Titan Text; only inputText varies per request
+TEXT_GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "maxTokenCount": 1000,
+    "topP": 0.9,
+    "stopSequences": []
+}
+
+# Per-chunk character budget for prompt context; citations still use the full chunk
+MAX_CONTEXT_CHARS_PER_CHUNK = 1500
+
+# Static prompt blocks; only context and question are filled in per request
+PROMPT_HEAD = "You are a helpful assistant for NYC residents. Answer the user's question based on the provided context. "
+PROMPT_TAIL = """
+
+Instructions:
+1. Answer the question using only the information provided in the context
+2. Be specific and helpful
+3. If the context doesn't contain enough information to answer the question, say so
+4. Keep your answer concise but informative
+5. Focus on practical steps and information NYC residents need
+
+Answer:"""
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -32,41 +92,50 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     try:
         # Parse request
-        body = json.loads(event.get('body', '{}'))
+        body = loads_json(event.get('body') or '{}')
         query = body.get('q', '')
         top_k = body.get('top_k', 6)
         
         if not query:
             return {
                 'statusCode': 400,
-                'body': json.dumps({
+                'body': dumps_json({
                     'error': 'Missing required parameter: q (query)'
                 })
             }
         
-        logger.info(f"Processing query: {query[:100]}...")
+        logger.info("Processing query", extra={'query': query[:100]})
         start_time = time.time()
         
-        # Retrieve relevant documents from Knowledge Base
-        retrieval_response = retrieve_documents(query, top_k)
+        # Serve repeated questions from the response cache
+        cache_key = (normalize_query(query), top_k)
+        cached = get_cached_answer(cache_key)
         
-        if not retrieval_response.get('retrievalResults'):
-            return {
-                'statusCode': 200,
-                'body': json.dumps({
-                    'answer': 'I cannot find specific information to answer your question. Please try rephrasing or contact NYC 311 for assistance.',
-                    'citations': [],
-                    'retrieval_time_ms': int((time.time() - start_time) * 1000)
-                })
-            }
-        
-        # Generate answer using retrieved context
-        answer, citations = generate_answer(query, retrieval_response)
+        if cached is not None:
+            answer, citations = cached
+            logger.info("Serving answer from response cache")
+        else:
+            # Retrieve relevant documents from Knowledge Base
+            retrieval_response = retrieve_documents(query, top_k)
+            
+            if not retrieval_response.get('retrievalResults'):
+                return {
+                    'statusCode': 200,
+                    'body': dumps_json({
+                        'answer': 'I cannot find specific information to answer your question. Please try rephrasing or contact NYC 311 for assistance.',
+                        'citations': [],
+                        'retrieval_time_ms': int((time.time() - start_time) * 1000)
+                    })
+                }
+            
+            # Generate answer using retrieved context
+            answer, citations = generate_answer(query, retrieval_response)
+            cache_answer(cache_key, answer, citations)
         
         total_time = int((time.time() - start_time) * 1000)
         
         # Log metrics
-        logger.info(f"Query processed in {total_time}ms", extra={
+        logger.info("Query processed", extra={
             'query_length': len(query),
             'retrieval_time_ms': total_time,
             'citations_count': len(citations),
@@ -75,7 +144,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         return {
             'statusCode': 200,
-            'body': json.dumps({
+            'body': dumps_json({
                 'answer': answer,
                 'citations': citations,
                 'retrieval_time_ms': total_time,
@@ -84,10 +153,10 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"Error processing query: {str(e)}", exc_info=True)
+        logger.error("Error processing query: %s", e, exc_info=True)
         return {
             'statusCode': 500,
-            'body': json.dumps({
+            'body': dumps_json({
                 'error': 'Internal server error',
                 'message': str(e)
             })
@@ -117,11 +186,11 @@ def retrieve_documents(query: str, top_k: int) -> Dict[str, Any]:
             }
         )
         
-        logger.info(f"Retrieved {len(response.get('retrievalResults', []))} documents")
+        logger.info("Retrieved documents", extra={'document_count': len(response.get('retrievalResults', []))})
         return response
         
     except ClientError as e:
-        logger.error(f"Error retrieving documents: {e}")
+        logger.error("Error retrieving documents: %s", e)
         raise
 
 def generate_answer(query: str, retrieval_response: Dict[str, Any]) -> tuple[str, List[Dict[str, str]]]:
@@ -138,21 +207,30 @@ def generate_answer(query: str, retrieval_response: Dict[str, Any]) -> tuple[str
     # Prepare context from retrieved documents
     context_parts = []
     citations = []
+    seen_chunks = set()
     
     for result in retrieval_response.get('retrievalResults', []):
         content = result.get('content', {})
         text = content.get('text', '')
-        metadata = content.get('metadata', {})
+        metadata = result.get('metadata', {})
         
         if text:
-            context_parts.append(text)
+            source_url = get_source_url(result)
+            section = metadata.get('section', '')
+            
+            # Only the first chunk per source section goes into the prompt; without
+            # a section, only exact duplicate chunks are dropped
+            chunk_key = (source_url, section) if source_url and section else text
+            if chunk_key not in seen_chunks:
+                seen_chunks.add(chunk_key)
+                context_parts.append(text[:MAX_CONTEXT_CHARS_PER_CHUNK])
             
             # Extract citation information
             citation = {
                 'text': text[:200] + '...' if len(text) > 200 else text,
-                'source_url': metadata.get('source_url', ''),
+                'source_url': source_url,
                 'title': metadata.get('title', ''),
-                'section': metadata.get('section', ''),
+                'section': section,
                 'relevance_score': result.get('score', 0)
             }
             citations.append(citation)
@@ -164,41 +242,29 @@ def generate_answer(query: str, retrieval_response: Dict[str, Any]) -> tuple[str
     context = "\n\n".join(context_parts)
     
     # Prepare prompt for Bedrock
-    prompt = f"""You are a helpful assistant for NYC residents. Answer the user's question based on the provided context. 
-
-Context:
-{context}
-
-Question: {query}
-
-Instructions:
-1. Answer the question using only the information provided in the context
-2. Be specific and helpful
-3. If the context doesn't contain enough information to answer the question, say so
-4. Keep your answer concise but informative
-5. Focus on practical steps and information NYC residents need
-
-Answer:"""
+    prompt = f"{PROMPT_HEAD}\n\nContext:\n{context}\n\nQuestion: {query}{PROMPT_TAIL}"
 
     try:
-        # Invoke Bedrock model (Titan Text Express)
-        response = bedrock_runtime.invoke_model(
-            modelId=BEDROCK_MODEL_ID,
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps({
-                "inputText": prompt,
-                "textGenerationConfig": {
-                    "temperature": 0.7,
-                    "maxTokenCount": 1000,
-                    "topP": 0.9,
-                    "stopSequences": []
-                }
-            })
-        )
+        request_body = {
+            "inputText": prompt,
+            "textGenerationConfig": TEXT_GENERATION_CONFIG
+        }
         
-        response_body = json.loads(response['body'].read())
-        answer = response_body['results'][0]['outputText'].strip()
+        body = dumps_json_bytes(request_body)
+        
+        # Invoke Bedrock model (Titan Text Express)
+        if STREAM_RESPONSES:
+            answer = invoke_model_streaming(body).strip()
+        else:
+            response = bedrock_runtime.invoke_model(
+                modelId=BEDROCK_MODEL_ID,
+                contentType="application/json",
+                accept="application/json",
+                body=body
+            )
+            
+            response_body = loads_json(response['body'].read())
+            answer = response_body['results'][0]['outputText'].strip()
         
         # Clean up answer
         if answer.startswith("Answer:"):
@@ -207,9 +273,57 @@ Answer:"""
         return answer, citations
         
     except ClientError as e:
-        logger.error(f"Error generating answer: {e}")
+        logger.error("Error generating answer: %s", e)
         raise
 
+def get_source_url(result: Dict[str, Any]) -> str:
+    """
+    Resolve the source location of a retrieval result.
+    
+    Args:
+        result: Single entry from the Retrieve API's retrievalResults
+        
+    Returns:
+        Custom source_url metadata, else the Knowledge Base source URI, else
+        the result location's URI/URL, or an empty string
+    """
+    metadata = result.get('metadata', {})
+    source_url = metadata.get('source_url') or metadata.get('x-amz-bedrock-kb-source-uri')
+    if source_url:
+        return source_url
+    
+    location = result.get('location', {})
+    return (
+        location.get('s3Location', {}).get('uri')
+        or location.get('webLocation', {}).get('url')
+        or ''
+    )
+
+def invoke_model_streaming(body: Any) -> str:
+    """
+    Invoke the Bedrock model with a streaming response and assemble the output.
+    
+    Args:
+        body: Serialized request body for the model
+        
+    Returns:
+        Concatenated output text from all streamed chunks
+    """
+    response = bedrock_runtime.invoke_model_with_response_stream(
+        modelId=BEDROCK_MODEL_ID,
+        contentType="application/json",
+        accept="application/json",
+        body=body
+    )
+    
+    output_parts = []
+    for event in response['body']:
+        chunk = event.get('chunk')
+        if chunk:
+            output_parts.append(loads_json(chunk['bytes']).get('outputText', ''))
+    
+    return "".join(output_parts)
+
 def format_citations(citations: List[Dict[str, str]]) -> List[Dict[str, str]]:
     """
     Format citations for better readability.
@@ -233,3 +347,59 @@ def format_citations(citations: List[Dict[str, str]]) -> List[Dict[str, str]]:
         formatted.append(formatted_citation)
     
     return formatted
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for cache lookups (case and whitespace insensitive)."""
+    return " ".join(query.lower().split())
+
+def get_cached_answer(cache_key: Tuple[str, Any]) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Look up a previously generated answer.
+    
+    Args:
+        cache_key: Tuple of (normalized query, top_k)
+        
+    Returns:
+        Tuple of (answer, citations), or None on a miss or expired entry
+    """
+    entry = response_cache.get(cache_key)
+    if entry is None:
+        return None
+    
+    expires_at, answer, citations = entry
+    if expires_at < time.time():
+        del response_cache[cache_key]
+        return None
+    
+    response_cache.move_to_end(cache_key)
+    return answer, citations
+
+def cache_answer(cache_key: Tuple[str, Any], answer: str, citations: List[Dict[str, Any]]) -> None:
+    """
+    Store a generated answer, evicting the least recently used entries.
+    
+    Args:
+        cache_key: Tuple of (normalized query, top_k)
+        answer: Generated answer
+        citations: Citations for the answer
+    """
+    if RESPONSE_CACHE_TTL_SECONDS <= 0:
+        return
+    
+    response_cache[cache_key] = (time.time() + RESPONSE_CACHE_TTL_SECONDS, answer, citations)
+    response_cache.move_to_end(cache_key)
+    
+    while len(response_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+        response_cache.popitem(last=False)
+
+def loads_json(data: Any) -> Any:
+    """Deserialize JSON from str or bytes, using orjson when available."""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def dumps_json(obj: Any) -> str:
+    """Serialize an object to a JSON string, using orjson when available."""
+    return orjson.dumps(obj).decode('utf-8') if orjson else json.dumps(obj)
+
+def dumps_json_bytes(obj: Any) -> bytes:
+    """Serialize an object to UTF-8 JSON bytes (e.g. a Bedrock request body), using orjson when available."""
+    return orjson.dumps(obj) if orjson else json.dumps(obj, ensure_ascii=False).encode('utf-8')
@@ -0,0 +1,61 @@
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+# Optional fast JSON encoder; falls back to the standard library when unavailable
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Attributes present on every LogRecord; anything else was passed via `extra`
+_STANDARD_RECORD_ATTRS = frozenset(
+    logging.LogRecord('', 0, '', 0, '', (), None).__dict__
+) | {'message', 'asctime', 'aws_request_id'}
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format log records as single-line JSON objects for CloudWatch.
+    
+    Each line carries the UTC timestamp, level, logger name and message.
+    Fields passed through `extra` are emitted as top-level keys, and the
+    Lambda request ID is included when the runtime provides it.
+    """
+    
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            'timestamp': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        
+        request_id = getattr(record, 'aws_request_id', None)
+        if request_id:
+            payload['request_id'] = request_id
+        
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_RECORD_ATTRS:
+                payload[key] = value
+        
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        
+        if orjson:
+            return orjson.dumps(payload, default=str).decode('utf-8')
+        return json.dumps(payload, default=str)
+
+def configure_json_logging(logger: logging.Logger) -> None:
+    """
+    Install the JSON formatter on the logger's handlers.
+    
+    Args:
+        logger: Logger to configure (the Lambda runtime attaches its handler to the root logger)
+    """
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+    
+    formatter = JsonFormatter()
+    for handler in logger.handlers:
+        handler.setFormatter(formatter)
@@ -7,6 +7,7 @@ Checks dependencies, file structure, and basic functionality.
 import os
 import sys
 import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 def test_file_structure():
@@ -20,6 +21,7 @@ def test_file_structure():
         'README.md',
         'src/lambda_function.py',
         'src/authorizer.py',
+        'src/structured_logging.py',
         'scripts/ingest_data.py',
         'events/test-event.json'
     ]
@@ -89,27 +91,38 @@ def test_sam_template():
         print(f"  ❌ template.yaml validation failed: {e}")
         return False
 
+def _compile_one(file_path):
+    """Compile a single file, returning (file_path, ok, error message)."""
+    try:
+        with open(file_path, 'r') as f:
+            compile(f.read(), file_path, 'exec')
+        return file_path, True, None
+    except SyntaxError as e:
+        return file_path, False, f"Syntax error: {e}"
+    except Exception as e:
+        return file_path, False, f"Error: {e}"
+
 def test_lambda_functions():
     """Test that Lambda functions have valid Python syntax."""
     print("\n🔧 Testing Lambda functions...")
     
     lambda_files = [
         'src/lambda_function.py',
-        'src/authorizer.py'
+        'src/authorizer.py',
+        'src/structured_logging.py'
     ]
     
     all_good = True
     
-    for file_path in lambda_files:
-        try:
-            with open(file_path, 'r') as f:
-                compile(f.read(), file_path, 'exec')
+    # compile() is CPU-bound and holds the GIL, so check files in separate processes
+    with ProcessPoolExecutor() as executor:
+        results = list(executor.map(_compile_one, lambda_files))
+    
+    for file_path, ok, error in results:
+        if ok:
             print(f"  ✅ {file_path} - Valid Python syntax")
-        except SyntaxError as e:
-            print(f"  ❌ {file_path} - Syntax error: {e}")
-            all_good = False
-        except Exception as e:
-            print(f"  ❌ {file_path} - Error: {e}")
+        else:
+            print(f"  ❌ {file_path} - {error}")
             all_good = False
     
     return all_good